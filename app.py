@@ -1,7 +1,12 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash, Response
 import os
 import sqlite3
 import json
+import math
+import re
+import textwrap
+import time
+import threading
 import hashlib
 from datetime import datetime
 from pathlib import Path
@@ -10,16 +15,95 @@ import faiss
 import numpy as np
 import requests
 from sentence_transformers import SentenceTransformer
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from contextlib import contextmanager
 import shutil
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-change-this'  # Change this to a random secret key
 app.config['UPLOAD_FOLDER'] = 'temp_uploads'
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500MB max upload
+app.config['SERVER_TIMING'] = os.environ.get('HIRE_SERVER_TIMING', '0') == '1'  # Server-Timing header on /api/search
 
 # Global model cache
 embed_model = None
 
+# LLM settings
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434/api/generate")
+LLM_MODEL_NAME = "gemma3:4b"
+LLM_KEEP_ALIVE = "30m"  # Keep the model resident between searches
+LLM_PROMPT_TOKEN_BUDGET = 1024  # Max prompt tokens (instructions + job + resume)
+LLM_RESUME_TOKEN_BUDGET = int(os.environ.get('HIRE_LLM_RESUME_TOKENS', 250))  # Resume excerpt share of the prompt
+LLM_MIN_RESUME_TOKENS = 64  # Floor for the resume excerpt
+LLM_MIN_JOB_TOKENS = 256  # Prompt tokens always left for the job description
+LLM_NUM_PREDICT = 384  # Max tokens the model may generate
+# Fixed context size: Ollama reloads the model whenever num_ctx changes between requests
+LLM_NUM_CTX = ((LLM_PROMPT_TOKEN_BUDGET + LLM_NUM_PREDICT + 255) // 256) * 256
+CHARS_PER_TOKEN = 4  # Rough estimate for English text
+
+# ==============================
+# METRICS
+# ==============================
+SEARCH_STAGE_SECONDS = Histogram(
+    'hire_search_stage_seconds', 'Time spent in each stage of /api/search', ['stage'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+CACHE_REQUESTS = Counter('hire_cache_requests_total', 'Cache lookups by cache and result', ['cache', 'result'])
+CACHE_HIT_RATIO = Gauge('hire_cache_hit_ratio', 'Fraction of cache lookups that were hits', ['cache'])
+MODEL_LOAD_SECONDS = Gauge('hire_model_load_seconds', 'Time taken by the last model load', ['model', 'context'])
+# Labelled by numeric db_id: /metrics is unauthenticated and database names are user-chosen
+INDEX_VECTORS = Gauge('hire_index_vectors', 'Vectors in each loaded FAISS index', ['db_id'])
+INDEX_BYTES = Gauge('hire_index_bytes', 'Approximate memory of each loaded FAISS index', ['db_id'])
+cache_stats = {}  # cache name -> (hits, lookups)
+cache_stats_lock = threading.Lock()
+
+# Stage names as they appear in the Server-Timing header
+SERVER_TIMING_NAMES = {
+    'user_db': 'db', 'model_load': 'model', 'load_database': 'load', 'encode': 'encode',
+    'index_search': 'search', 'passage_rank': 'rank', 'llm_analysis': 'llm'
+}
+
+@contextmanager
+def timed_stage(stage, timings):
+    """Add the time spent in a search stage to the per-request timings dict"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+def observe_search_timings(timings):
+    """Record one histogram sample per stage for a search request"""
+    # Per-candidate stages (passage_rank, llm_analysis) arrive summed over the request
+    for stage, seconds in timings.items():
+        SEARCH_STAGE_SECONDS.labels(stage=stage).observe(seconds)
+
+def record_cache_lookup(cache, hit):
+    """Count a cache lookup and refresh the hit ratio"""
+    CACHE_REQUESTS.labels(cache=cache, result='hit' if hit else 'miss').inc()
+    with cache_stats_lock:
+        hits, total = cache_stats.get(cache, (0, 0))
+        hits, total = hits + int(hit), total + 1
+        cache_stats[cache] = (hits, total)
+        CACHE_HIT_RATIO.labels(cache=cache).set(hits / total)
+
+def record_index_size(db_id, index):
+    """Export the size of a loaded FAISS index"""
+    INDEX_VECTORS.labels(db_id=str(db_id)).set(index.ntotal)
+    INDEX_BYTES.labels(db_id=str(db_id)).set(index.ntotal * index.d * 4)  # float32 flat index
+
+def server_timing_header(timings):
+    """Format per-stage timings as a Server-Timing header value"""
+    return ', '.join(f"{SERVER_TIMING_NAMES[stage]};dur={seconds * 1000:.1f}"
+                     for stage, seconds in timings.items())
+
+def search_response(payload, timings, status=200):
+    """JSON response for /api/search that records stage timings, with Server-Timing if enabled"""
+    observe_search_timings(timings)
+    response = jsonify(payload)
+    if app.config['SERVER_TIMING'] and timings:
+        response.headers['Server-Timing'] = server_timing_header(timings)
+    return response, status
+
 # ==============================
 # USER AUTHENTICATION DATABASE
 # ==============================
@@ -130,6 +214,7 @@ def process_resumes_from_folder(folder_path, db_name):
     
     # Save index
     faiss.write_index(embedder.index, embedder.index_path)
+    MODEL_LOAD_SECONDS.labels(model='all-mpnet-base-v2', context='ingest').set(embedder.model_load_time)
     
     return db_path, index_path, embedder.current_id
 
@@ -161,10 +246,12 @@ def load_database(db_path, index_path):
         print(f"Error loading database: {e}")
         return None, None
 
-def search_candidates(job_description, index, resume_dict, model, top_k=5):
+def search_candidates(job_description, index, resume_dict, model, top_k=5, job_embedding=None):
     """Search for matching candidates"""
-    job_embedding = model.encode([job_description])
-    distances, indices = index.search(job_embedding, top_k)
+    if job_embedding is None:
+        job_embedding = model.encode([job_description])[0]
+    query = np.array([job_embedding]).astype('float32')
+    distances, indices = index.search(query, top_k)
     
     retrieved = []
     for idx in indices[0]:
@@ -174,9 +261,69 @@ def search_candidates(job_description, index, resume_dict, model, top_k=5):
     
     return retrieved
 
-def analyze_with_llm(job_description, candidate, ollama_url="http://localhost:11434/api/generate", model_name="gemma3:4b"):
-    """Analyze candidate using LLM"""
-    prompt = f"""
+# ==============================
+# LLM PROMPT CONSTRUCTION
+# ==============================
+def estimate_tokens(text):
+    """Rough token count for a piece of text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def split_into_passages(resume_text, max_chars=400):
+    """Split resume text into short passages along blank lines and line breaks"""
+    passages = []
+    for block in re.split(r'\n\s*\n', resume_text):
+        current = ""
+        for line in block.split('\n'):
+            # OCR output often has no line breaks, so hard-wrap long lines
+            for piece in textwrap.wrap(line.strip(), max_chars):
+                if current and len(current) + len(piece) + 1 > max_chars:
+                    passages.append(current)
+                    current = ""
+                current = f"{current}\n{piece}" if current else piece
+        if current:
+            passages.append(current)
+    return passages
+
+def truncate_to_tokens(text, token_budget):
+    """Cut text down to roughly token_budget tokens"""
+    max_chars = max(token_budget, 0) * CHARS_PER_TOKEN
+    return text if len(text) <= max_chars else text[:max_chars].rstrip()
+
+def select_relevant_passages(resume_text, token_budget, model=None, job_embedding=None):
+    """Keep the resume passages most similar to the job description within a token budget"""
+    passages = split_into_passages(resume_text)
+    if not passages:
+        return ""
+    
+    # Everything fits, or no embeddings to rank with: keep passages in order
+    if sum(estimate_tokens(p) for p in passages) <= token_budget or model is None or job_embedding is None:
+        order = list(range(len(passages)))
+    else:
+        passage_embeddings = np.array(model.encode(passages, show_progress_bar=False)).astype('float32')
+        query = np.array(job_embedding).astype('float32')
+        norms = np.linalg.norm(passage_embeddings, axis=1) * np.linalg.norm(query)
+        scores = passage_embeddings @ query / np.maximum(norms, 1e-12)
+        order = [int(i) for i in np.argsort(-scores)]
+    
+    selected = {}
+    used = 0
+    for i in order:
+        cost = estimate_tokens(passages[i]) + 1
+        if used + cost > token_budget:
+            continue
+        selected[i] = passages[i]
+        used += cost
+    
+    # Never send an empty excerpt: fall back to the best passage cut to the budget
+    if not selected:
+        selected[order[0]] = truncate_to_tokens(passages[order[0]], token_budget)
+    
+    # Present the chosen passages in their original reading order
+    return "\n".join(selected[i] for i in sorted(selected))
+
+def build_llm_prompt(job_description, candidate, resume_excerpt):
+    """Build the analysis prompt for one candidate"""
+    return f"""
 You are an AI recruitment assistant.
 
 Job Description:
@@ -184,38 +331,117 @@ Job Description:
 
 Candidate Name: {candidate['candidate_name']}
 
-Candidate Resume:
-{candidate['resume_text']}
-
-Analyze the resume and respond ONLY in valid JSON:
+Relevant Resume Excerpts:
+{resume_excerpt}
 
-{{
-  "resume_id": {candidate['id']},
-  "candidate_name": "{candidate['candidate_name']}",
-  "match_score": 0,
-  "strengths": [],
-  "gaps": [],
-  "summary": ""
-}}
+Analyze the resume and respond ONLY with a JSON object with these keys:
+"match_score" (integer 0-100), "strengths" (list of strings),
+"gaps" (list of strings), "summary" (string).
 """
+
+def fit_prompt_to_budget(job_description, candidate, model=None, job_embedding=None,
+                         resume_budget=LLM_RESUME_TOKEN_BUDGET, token_budget=LLM_PROMPT_TOKEN_BUDGET):
+    """Build a prompt with a resume excerpt of resume_budget tokens that fits within token_budget"""
+    # The job description gets whatever the template and resume excerpt leave over,
+    # and never less than LLM_MIN_JOB_TOKENS however large the configured resume budget
+    overhead = estimate_tokens(build_llm_prompt("", candidate, ""))
+    resume_budget = max(min(resume_budget, token_budget - overhead - LLM_MIN_JOB_TOKENS), LLM_MIN_RESUME_TOKENS)
+    job_description = truncate_to_tokens(job_description, token_budget - overhead - resume_budget)
+    excerpt = select_relevant_passages(candidate['resume_text'], resume_budget, model, job_embedding)
+    return build_llm_prompt(job_description, candidate, excerpt)
+
+def _to_string_list(value, field):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        raise ValueError(f"'{field}' must be a list")
+    return [str(v).strip() for v in value if v is not None and str(v).strip()]
+
+def _to_score(value):
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        # Accept answers such as "85%" or "85/100"
+        number = re.search(r'-?\d+(?:\.\d+)?', value)
+        if not number:
+            raise ValueError("'match_score' must be a number")
+        value = number.group()
+    try:
+        score = float(value)
+        if not math.isfinite(score):
+            raise ValueError
+        return min(max(int(round(score)), 0), 100)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError("'match_score' must be a number")
+
+def parse_llm_response(output, candidate):
+    """Parse and validate the LLM's JSON analysis"""
+    try:
+        data = json.loads(output)
+    except json.JSONDecodeError:
+        # Fall back to the outermost object if the model wrapped it in text
+        start = output.find("{")
+        end = output.rfind("}") + 1
+        if start == -1 or end <= start:
+            raise ValueError("No JSON object in LLM response")
+        data = json.loads(output[start:end])
+    
+    if not isinstance(data, dict):
+        raise ValueError("LLM response is not a JSON object")
+    
+    summary = data.get("summary")
+    return {
+        "resume_id": candidate['id'],
+        "candidate_name": candidate['candidate_name'],
+        "match_score": _to_score(data.get("match_score")),
+        "strengths": _to_string_list(data.get("strengths"), "strengths"),
+        "gaps": _to_string_list(data.get("gaps"), "gaps"),
+        "summary": "" if summary is None else str(summary).strip()
+    }
+
+def llm_call_stats(response_json, elapsed):
+    """Token counts and throughput reported by Ollama for one call"""
+    eval_count = response_json.get("eval_count", 0)
+    eval_duration = response_json.get("eval_duration", 0) / 1e9
+    return {
+        "prompt_tokens": response_json.get("prompt_eval_count", 0),
+        "output_tokens": eval_count,
+        "tokens_per_sec": round(eval_count / eval_duration, 2) if eval_duration else 0.0,
+        "elapsed_sec": round(elapsed, 3)
+    }
+
+def analyze_with_llm(job_description, candidate, model=None, job_embedding=None,
+                     ollama_url=OLLAMA_URL, model_name=LLM_MODEL_NAME, prompt=None):
+    """Analyze candidate using LLM"""
+    if prompt is None:
+        prompt = fit_prompt_to_budget(job_description, candidate, model, job_embedding)
+    stats = None
     
     try:
         payload = {
             "model": model_name,
             "prompt": prompt,
-            "stream": False
+            "stream": False,
+            "format": "json",
+            "keep_alive": LLM_KEEP_ALIVE,
+            "options": {"num_ctx": LLM_NUM_CTX, "num_predict": LLM_NUM_PREDICT}
         }
         
+        start = time.perf_counter()
         response = requests.post(ollama_url, json=payload, timeout=600)
         response.raise_for_status()
+        response_json = response.json()
+        stats = llm_call_stats(response_json, time.perf_counter() - start)
+        print(f"LLM analysis for resume {candidate['id']}: {stats['output_tokens']} tokens "
+              f"at {stats['tokens_per_sec']} tok/s ({stats['elapsed_sec']}s)")
         
-        output = response.json()["response"]
-        start = output.find("{")
-        end = output.rfind("}") + 1
-        
-        return json.loads(output[start:end])
+        result = parse_llm_response(response_json["response"], candidate)
+        result["llm_stats"] = stats
+        return result
     except Exception as e:
-        return {
+        result = {
             "resume_id": candidate['id'],
             "candidate_name": candidate['candidate_name'],
             "match_score": 0,
@@ -223,6 +449,9 @@ Analyze the resume and respond ONLY in valid JSON:
             "gaps": [],
             "summary": f"Error analyzing: {str(e)}"
         }
+        if stats:
+            result["llm_stats"] = stats
+        return result
 
 # ==============================
 # FLASK ROUTES
@@ -381,44 +610,60 @@ def api_search():
     if not job_description:
         return jsonify({'error': 'Job description required'}), 400
     
+    timings = {}
+    
     # Get database paths
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''SELECT db_path, index_path 
-                FROM user_databases 
-                WHERE id = ? AND user_id = ?''', (db_id, session['user_id']))
-    db_info = c.fetchone()
-    conn.close()
+    with timed_stage('user_db', timings):
+        conn = sqlite3.connect('users.db')
+        c = conn.cursor()
+        c.execute('''SELECT id, db_path, index_path 
+                    FROM user_databases 
+                    WHERE id = ? AND user_id = ?''', (db_id, session['user_id']))
+        db_info = c.fetchone()
+        conn.close()
     
     if not db_info:
-        return jsonify({'error': 'Database not found'}), 404
+        return search_response({'error': 'Database not found'}, timings, 404)
     
-    db_path, index_path = db_info
+    # Use the stored id from here on: SQLite matches "1", "1.0" and 1 to the same row
+    db_id, db_path, index_path = db_info
     
     # Load model if needed
+    record_cache_lookup('embed_model', embed_model is not None)
     if embed_model is None:
-        embed_model = SentenceTransformer('all-mpnet-base-v2')
+        with timed_stage('model_load', timings):
+            embed_model = SentenceTransformer('all-mpnet-base-v2')
+        MODEL_LOAD_SECONDS.labels(model='all-mpnet-base-v2', context='search').set(timings['model_load'])
     
     # Load database
-    index, resume_dict = load_database(db_path, index_path)
+    with timed_stage('load_database', timings):
+        index, resume_dict = load_database(db_path, index_path)
     
     if index is None or resume_dict is None:
-        return jsonify({'error': 'Failed to load database'}), 500
+        return search_response({'error': 'Failed to load database'}, timings, 500)
+    record_index_size(db_id, index)
     
     # Search
-    candidates = search_candidates(job_description, index, resume_dict, embed_model, top_k)
+    with timed_stage('encode', timings):
+        job_embedding = embed_model.encode([job_description])[0]
+    with timed_stage('index_search', timings):
+        candidates = search_candidates(job_description, index, resume_dict, embed_model, top_k, job_embedding)
     
     if not candidates:
-        return jsonify({'candidates': []})
+        return search_response({'candidates': []}, timings)
     
     # Analyze with LLM if requested
     if use_llm:
         results = []
         for candidate in candidates:
-            result = analyze_with_llm(job_description, candidate)
+            # Passage ranking encodes with the embedding model; keep it out of the LLM time
+            with timed_stage('passage_rank', timings):
+                prompt = fit_prompt_to_budget(job_description, candidate, embed_model, job_embedding)
+            with timed_stage('llm_analysis', timings):
+                result = analyze_with_llm(job_description, candidate, prompt=prompt)
             results.append(result)
         results.sort(key=lambda x: x.get('match_score', 0), reverse=True)
-        return jsonify({'candidates': results, 'analyzed': True})
+        return search_response({'candidates': results, 'analyzed': True}, timings)
     else:
         # Return basic candidate info
         simple_results = [
@@ -429,7 +674,11 @@ def api_search():
             }
             for c in candidates
         ]
-        return jsonify({'candidates': simple_results, 'analyzed': False})
+        return search_response({'candidates': simple_results, 'analyzed': False}, timings)
+
+@app.route('/metrics')
+def metrics():
+    return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
 
 if __name__ == '__main__':
     os.makedirs('temp_uploads', exist_ok=True)
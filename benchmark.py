@@ -0,0 +1,491 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import platform
+import subprocess
+import threading
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import fitz  # PyMuPDF
+import faiss
+import numpy as np
+import psutil
+import requests
+import pytesseract
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPO_DIR = Path(__file__).resolve().parent
+
+# ==============================
+# SYNTHETIC RESUME GENERATION
+# ==============================
+FIRST_NAMES = ["Victoria", "Rahul", "Dana", "Priya", "Marcus", "Aisha", "Kenji", "Elena", "Samuel", "Nadia"]
+LAST_NAMES = ["Clark", "Sharma", "Lowell", "Iyer", "Bennett", "Khan", "Tanaka", "Rossi", "Okafor", "Petrova"]
+ROLES = ["Software Engineer", "Data Scientist", "Backend Developer", "DevOps Engineer", "ML Engineer", "Web Developer"]
+SKILLS = ["Python", "Java", "Spring Boot", "SQL", "Docker", "Kubernetes", "React", "Machine Learning",
+          "TensorFlow", "PyTorch", "AWS", "Flask", "Django", "Git", "Linux", "Pandas", "C++", "REST APIs"]
+COMPANIES = ["Infosys", "TCS", "Wipro", "Accenture", "Capgemini", "Cognizant", "IBM", "Oracle"]
+QUERIES = [
+    "Python developer with machine learning experience",
+    "Java backend engineer with Spring Boot",
+    "DevOps engineer with Docker and Kubernetes on AWS",
+    "Frontend web developer skilled in React",
+    "Data scientist with Pandas, SQL and TensorFlow",
+]
+
+def make_resume_text(rng):
+    """Generate the text of one synthetic resume"""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    role = rng.choice(ROLES)
+    skills = rng.sample(SKILLS, 6)
+    lines = [name, f"{role} | {name.split()[0].lower()}@example.com | +91 98765 43210", ""]
+    lines += ["SUMMARY", f"{role} with {rng.randint(1, 12)} years of experience building "
+              f"production systems using {skills[0]} and {skills[1]}.", ""]
+    lines += ["SKILLS", ", ".join(skills), ""]
+    lines.append("EXPERIENCE")
+    for _ in range(rng.randint(2, 4)):
+        lines.append(f"{rng.choice(ROLES)}, {rng.choice(COMPANIES)} ({rng.randint(2012, 2024)})")
+        lines.append(f"- Delivered features in {rng.choice(skills)} and improved reliability of services.")
+        lines.append(f"- Worked with {rng.choice(skills)} and {rng.choice(skills)} across teams.")
+    lines += ["", "EDUCATION", "B.E. Computer Engineering, University of Pune"]
+    return "\n".join(lines)
+
+def write_text_pdf(path, text):
+    """Write a PDF with a real text layer"""
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_textbox(fitz.Rect(50, 50, 545, 800), text, fontsize=10)
+    doc.save(path)
+    doc.close()
+
+def write_image_pdf(path, text):
+    """Write a PDF whose only content is a scanned-style image of the text"""
+    src = fitz.open()
+    src_page = src.new_page()
+    src_page.insert_textbox(fitz.Rect(50, 50, 545, 800), text, fontsize=10)
+    pix = src_page.get_pixmap(dpi=150)
+    src.close()
+
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_image(page.rect, pixmap=pix)
+    doc.save(path)
+    doc.close()
+
+def generate_resumes(folder, count, image_only, seed):
+    """Generate `count` synthetic resume PDFs into folder"""
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    kind = "image" if image_only else "text"
+    writer = write_image_pdf if image_only else write_text_pdf
+    paths = []
+    for i in range(count):
+        path = Path(folder) / f"synthetic_{kind}_{i:05d}.pdf"
+        writer(str(path), make_resume_text(rng))
+        paths.append(path)
+    return paths
+
+# ==============================
+# MEASUREMENT HELPERS
+# ==============================
+def process_rss_mb(pid):
+    """Resident set size of process `pid` in MB"""
+    try:
+        return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+    except psutil.Error:
+        return None
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    info = psutil.Process().memory_info()
+    if hasattr(info, "peak_wset"):  # Windows
+        return info.peak_wset / (1024 * 1024)
+    if resource is None:
+        return info.rss / (1024 * 1024)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class RSSSampler:
+    """Samples the RSS of process `pid` in a background thread"""
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = process_rss_mb(self.pid)
+            if rss is not None:
+                self.samples.append(rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self):
+        if not self.samples:
+            print(f"⚠️ Could not sample RSS of process {self.pid}; RSS will not be compared")
+            return {"rss_mb_mean": None, "rss_mb_max": None}
+        return {"rss_mb_mean": round(float(np.mean(self.samples)), 1),
+                "rss_mb_max": round(float(np.max(self.samples)), 1)}
+
+def latency_summary(latencies):
+    """p50/p95/p99 and mean of a list of latencies in seconds, reported in ms"""
+    if not latencies:
+        return {"count": 0}
+    ms = np.array(latencies) * 1000
+    return {
+        "count": len(latencies),
+        "mean_ms": round(float(ms.mean()), 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "max_ms": round(float(ms.max()), 2)
+    }
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# ==============================
+# INGEST BENCHMARK
+# ==============================
+def run_ingest(embedder, pdf_files, stream_name, batch_size):
+    """Ingest pdf_files and report throughput for each stage"""
+    for key in embedder.stage_times:
+        embedder.stage_times[key] = 0.0
+    embedder.ocr_pages = 0
+    start_count = embedder.current_id
+
+    start = time.perf_counter()
+    embedder.process_batch(pdf_files, stream_name=stream_name, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+
+    ingested = embedder.current_id - start_count
+    stages = {}
+    for stage, seconds in embedder.stage_times.items():
+        stages[stage] = {
+            "seconds": round(seconds, 4),
+            "resumes_per_sec": round(ingested / seconds, 2) if seconds and ingested else None
+        }
+    return {
+        "files": len(pdf_files),
+        "ingested": ingested,
+        "ocr_pages": embedder.ocr_pages,
+        "seconds": round(elapsed, 4),
+        "resumes_per_sec": round(ingested / elapsed, 2) if elapsed else None,
+        "stages": stages
+    }
+
+# ==============================
+# STUB LLM SERVER
+# ==============================
+def make_stub_handler(delay, output_tokens):
+    class StubOllamaHandler(BaseHTTPRequestHandler):
+        """Answers /api/generate like Ollama with a fixed analysis after `delay` seconds"""
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            time.sleep(delay)
+            analysis = {"match_score": random.randint(40, 95), "strengths": ["Relevant skills"],
+                        "gaps": ["Limited domain experience"], "summary": "Synthetic stub analysis."}
+            body = json.dumps({
+                "model": payload.get("model"),
+                "response": json.dumps(analysis),
+                "done": True,
+                "prompt_eval_count": len(payload.get("prompt", "")) // 4,
+                "eval_count": output_tokens,
+                "eval_duration": int(max(delay, 1e-3) * 1e9)
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+    return StubOllamaHandler
+
+def start_server(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+# ==============================
+# APP SERVER PROCESS
+# ==============================
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_app_process(workdir, ollama_url, timeout=120):
+    """Run the Flask app in its own process so load generation doesn't share its GIL or memory"""
+    port = free_port()
+    env = dict(os.environ, OLLAMA_URL=ollama_url,
+               PYTHONPATH=os.pathsep.join(filter(None, [str(REPO_DIR), os.environ.get("PYTHONPATH")])))
+    proc = subprocess.Popen(
+        [sys.executable, "-c", f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True)"],
+        cwd=workdir, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"App server exited with code {proc.returncode}")
+        try:
+            requests.get(base_url, timeout=1)
+            return proc, base_url
+        except requests.RequestException:
+            time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError(f"App server did not start within {timeout}s")
+
+def stop_app_process(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+# ==============================
+# SEARCH LOAD TEST
+# ==============================
+def run_load_test(base_url, server_pid, username, password, db_id, clients, requests_per_client,
+                  top_k, use_llm):
+    """Hit /api/search from concurrent logged-in clients"""
+    def login():
+        session = requests.Session()
+        session.post(f"{base_url}/login", data={"username": username, "password": password})
+        return session
+
+    def search(session, query):
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{base_url}/api/search", timeout=600, json={
+                "db_id": db_id, "job_description": query, "top_k": top_k, "use_llm": use_llm})
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    def client(client_no):
+        session = login()
+        latencies, errors = [], 0
+        for i in range(requests_per_client):
+            latency, ok = search(session, QUERIES[(client_no + i) % len(QUERIES)])
+            latencies.append(latency)
+            errors += 0 if ok else 1
+        return latencies, errors
+
+    # One warm-up search so the server's model load and first LLM call are not counted
+    warmup_latency, warmup_ok = search(login(), QUERIES[0])
+    if not warmup_ok:
+        raise RuntimeError("Warm-up search failed")
+
+    with RSSSampler(server_pid) as sampler:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            outcomes = list(pool.map(client, range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies = [lat for lats, _ in outcomes for lat in lats]
+    errors = sum(err for _, err in outcomes)
+    result = {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": errors,
+        "use_llm": use_llm,
+        "top_k": top_k,
+        "seconds": round(elapsed, 4),
+        "requests_per_sec": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "warmup_ms": round(warmup_latency * 1000, 2),
+        "latency": latency_summary(latencies)
+    }
+    result.update(sampler.summary())
+    return result
+
+# ==============================
+# REGRESSION CHECK
+# ==============================
+def compare_results(current, baseline, tolerance):
+    """Return a list of regressions beyond `tolerance` (fraction) against a baseline run"""
+    regressions = []
+
+    def check(label, new, old, higher_is_better):
+        if new is None or old is None or old == 0:
+            return
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        if worse > tolerance:
+            regressions.append(f"{label}: {old} -> {new} ({change:+.1%})")
+
+    for kind, run in current.get("ingest", {}).items():
+        old = baseline.get("ingest", {}).get(kind, {})
+        check(f"ingest[{kind}] resumes_per_sec", run.get("resumes_per_sec"), old.get("resumes_per_sec"), True)
+
+    new_search = current.get("search", {})
+    old_search = baseline.get("search", {})
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        check(f"search {key}", new_search.get("latency", {}).get(key),
+              old_search.get("latency", {}).get(key), False)
+    check("search rss_mb_max", new_search.get("rss_mb_max"), old_search.get("rss_mb_max"), False)
+    return regressions
+
+# ==============================
+# MAIN EXECUTION
+# ==============================
+def parse_args():
+    parser = argparse.ArgumentParser(description="Ingest and search benchmark for HIRE")
+    parser.add_argument("--text-resumes", type=int, default=200, help="Synthetic resumes with a text layer")
+    parser.add_argument("--image-resumes", type=int, default=20, help="Synthetic image-only resumes (needs Tesseract)")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent search clients")
+    parser.add_argument("--requests", type=int, default=10, help="Searches per client")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--no-llm", action="store_true", help="Load-test search without LLM analysis")
+    parser.add_argument("--stub-delay", type=float, default=0.05, help="Seconds the stub LLM takes per call")
+    parser.add_argument("--tesseract-cmd", help="Path to the tesseract binary")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write JSON results")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression as a fraction")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep-workdir", action="store_true")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    random.seed(args.seed)
+    output_path = Path(args.output).resolve()
+    baseline_path = Path(args.baseline).resolve() if args.baseline else None
+
+    print("=" * 60)
+    print("HIRE BENCHMARK")
+    print("=" * 60)
+
+    # The app keeps users.db and databases/ in the working directory
+    workdir = tempfile.mkdtemp(prefix="hire_bench_")
+    orig_cwd = os.getcwd()
+    os.chdir(workdir)
+
+    stub = start_server(ThreadingHTTPServer(("127.0.0.1", 0), make_stub_handler(args.stub_delay, 120)))
+    ollama_url = f"http://127.0.0.1:{stub.server_port}/api/generate"
+
+    sys.path.insert(0, str(REPO_DIR))
+    import app as hire_app
+    from resume_embeddings import ResumeEmbedder
+
+    # resume_embeddings sets its own (Windows) Tesseract path on import, so override it afterwards
+    tesseract_cmd = args.tesseract_cmd or shutil.which("tesseract")
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    ocr_failed = False
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "ingest": {}
+    }
+
+    try:
+        # Generate PDFs
+        print(f"\n📄 Generating {args.text_resumes} text and {args.image_resumes} image-only resumes...")
+        text_pdfs = generate_resumes("resumes_text", args.text_resumes, False, args.seed)
+        image_pdfs = generate_resumes("resumes_image", args.image_resumes, True, args.seed + 1)
+
+        # Ingest
+        os.makedirs("databases", exist_ok=True)
+        embedder = ResumeEmbedder(base_path=workdir, db_path="databases/bench.db",
+                                  index_path="databases/bench.index")
+        results["model_load_seconds"] = round(embedder.model_load_time, 3)
+        for kind, pdfs in (("text", text_pdfs), ("image", image_pdfs)):
+            if pdfs:
+                results["ingest"][kind] = run_ingest(embedder, pdfs, f"Synthetic_{kind}", args.batch_size)
+                print(f"✓ Ingest [{kind}]: {results['ingest'][kind]['resumes_per_sec']} resumes/sec")
+        image_run = results["ingest"].get("image")
+        if image_run and (image_run["ingested"] < image_run["files"] or image_run["ocr_pages"] == 0):
+            ocr_failed = True
+            image_run["error"] = (f"OCR failed: ingested {image_run['ingested']}/{image_run['files']} "
+                                  f"image-only resumes ({image_run['ocr_pages']} OCR pages) using "
+                                  f"'{pytesseract.pytesseract.tesseract_cmd}'. Check --tesseract-cmd.")
+            print(f"❌ {image_run['error']}")
+        faiss.write_index(embedder.index, embedder.index_path)
+        results["ingest_rss_mb_peak"] = peak_rss_mb()
+
+        if embedder.current_id == 0:
+            print("❌ No resumes were ingested, skipping search load test")
+        else:
+            # Register a user and database with the app
+            hire_app.init_user_db()
+            username, password = "bench", "bench-password"
+            hire_app.create_user(username, password, "bench@example.com")
+            user_id = hire_app.verify_user(username, password)
+            hire_app.save_user_database(user_id, "bench", embedder.db_path, embedder.index_path,
+                                        embedder.current_id)
+            db_id = hire_app.get_user_databases(user_id)[0][0]
+
+            server, base_url = start_app_process(workdir, ollama_url)
+            print(f"\n🔍 Load-testing /api/search with {args.clients} clients x {args.requests} requests...")
+            try:
+                results["search"] = run_load_test(base_url, server.pid, username, password, db_id,
+                                                  args.clients, args.requests, args.top_k, not args.no_llm)
+            finally:
+                stop_app_process(server)
+            latency = results["search"]["latency"]
+            print(f"✓ Search: p50 {latency.get('p50_ms')}ms | p95 {latency.get('p95_ms')}ms | "
+                  f"p99 {latency.get('p99_ms')}ms | max RSS {results['search']['rss_mb_max']}MB")
+    finally:
+        stub.shutdown()
+        os.chdir(orig_cwd)
+        if args.keep_workdir:
+            print(f"\n📁 Work directory kept at '{workdir}'")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(output_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results saved to '{output_path}'")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ Regressions against '{baseline_path.name}':")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"\n✅ No regressions against '{baseline_path.name}'")
+
+    if ocr_failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,7 @@ from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
 import io
+import time
 
 Image.MAX_IMAGE_PIXELS = None
 pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
@@ -59,10 +60,15 @@ class ResumeEmbedder:
         self.db_path = db_path
         self.index_path = index_path
         print("Loading sentence transformer model...")
+        start = time.perf_counter()
         self.model = SentenceTransformer('all-mpnet-base-v2')
+        self.model_load_time = time.perf_counter() - start
         self.dimension = 768
         self.index = faiss.IndexFlatL2(self.dimension)
         self.current_id = 0
+        # Cumulative seconds spent in each ingest stage ('ocr' is part of 'extract')
+        self.stage_times = {'extract': 0.0, 'ocr': 0.0, 'embed': 0.0, 'index': 0.0, 'store': 0.0}
+        self.ocr_pages = 0
         self._init_db()
         print("✓ Model loaded and database initialized")
     
@@ -93,10 +99,13 @@ class ResumeEmbedder:
                 
                 # If no text found, use OCR
                 if len(page_text.strip()) < 50:
+                    ocr_start = time.perf_counter()
                     pix = page.get_pixmap(dpi=150)
                     img_data = pix.tobytes("png")
                     img = Image.open(io.BytesIO(img_data))
                     page_text = pytesseract.image_to_string(img)
+                    self.stage_times['ocr'] += time.perf_counter() - ocr_start
+                    self.ocr_pages += 1
                 
                 text += page_text + "\n"
             
@@ -119,7 +128,9 @@ class ResumeEmbedder:
             print(f"  Batch {batch_start//batch_size + 1}: Processing {len(batch)} files...")
             
             for pdf_path in batch:
+                start = time.perf_counter()
                 text = self.extract_text_from_pdf(pdf_path)
+                self.stage_times['extract'] += time.perf_counter() - start
                 if text:
                     # Truncate to avoid token limits
                     text = text[:2000]
@@ -142,13 +153,18 @@ class ResumeEmbedder:
             
             # Generate embeddings
             print(f"  Generating embeddings for {len(texts)} resumes...")
+            start = time.perf_counter()
             embeddings = self.model.encode(texts, show_progress_bar=False)
             embeddings = np.array(embeddings).astype('float32')
+            self.stage_times['embed'] += time.perf_counter() - start
             
             # Add to FAISS
+            start = time.perf_counter()
             self.index.add(embeddings)
+            self.stage_times['index'] += time.perf_counter() - start
             
             # Store metadata in SQLite
+            start = time.perf_counter()
             conn = sqlite3.connect(self.db_path)
             c = conn.cursor()
             for meta in metadata:
@@ -159,6 +175,7 @@ class ResumeEmbedder:
                 self.current_id += 1
             conn.commit()
             conn.close()
+            self.stage_times['store'] += time.perf_counter() - start
             
             print(f"  ✓ Processed {len(texts)} resumes (Total so far: {self.current_id})")
     